@@ -1,45 +1,92 @@
 import argparse
+import os
+import sys
+import numpy as np
 import pandas as pd
+import matplotlib
+
+# Senza display (es. server) evita l'avvio di Tk/Qt: si salva solo su file
+if sys.platform.startswith('linux') and not (
+    os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')
+):
+    matplotlib.use('Agg')
+
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 
-def periodo_year(p):
-    """Estrae solo l'anno dal periodo"""
-    return int(p[:4])
+# Figura riutilizzata tra chiamate successive (es. un PNG per provincia)
+_FIG = None
+_AX = None
+
+def _get_axes():
+    """Restituisce la figura condivisa, creandola solo se necessario"""
+    global _FIG, _AX
+    if _FIG is None or not plt.fignum_exists(_FIG.number):
+        _FIG, _AX = plt.subplots(figsize=(10, 6))
+    else:
+        _AX.clear()
+    return _FIG, _AX
 
-def plot_data(file_path: str):
+def plot_data(file_path: str, output_png: str = None, ax=None):
     # Leggi il CSV
-    df = pd.read_csv(file_path)
+    df = pd.read_csv(
+        file_path,
+        usecols=['periodo', 'provincia', 'num_imprese_attive'],
+        dtype={'periodo': 'string', 'provincia': 'category', 'num_imprese_attive': 'int32'},
+        parse_dates=False,
+        engine='c'
+    )
 
-    # Ordina i dati per anno
-    df['anno'] = df['periodo'].map(periodo_year)
+    # Ordina i dati per anno (solo l'anno dal periodo)
+    df['anno'] = df['periodo'].str[:4].astype(np.int16)
     df = df.sort_values('anno')
 
-    # Crea il grafico
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.plot(df['anno'], df['num_imprese_attive'], marker='o', linestyle='-')
+    # Crea il grafico (o riusa quello esistente)
+    if ax is None:
+        fig, ax = _get_axes()
+    else:
+        fig = ax.figure
+    # Una linea per provincia (il CSV può contenerne più di una)
+    province = []
+    for provincia, gruppo in df.groupby('provincia', observed=True):
+        ax.plot(gruppo['anno'], gruppo['num_imprese_attive'], marker='o', linestyle='-', label=provincia)
+        province.append(provincia)
 
     # Etichette e titolo
-    ax.set_title('Numero di imprese attive per provincia di Venezia')
+    if len(province) == 1:
+        ax.set_title(f'Numero di imprese attive per provincia di {province[0]}')
+    else:
+        ax.set_title('Numero di imprese attive per provincia')
+        ax.legend()
     ax.set_xlabel('Anno')
     ax.set_ylabel('Numero imprese attive')
 
     # Intervallo Y ogni 1000
-    min_val = df['num_imprese_attive'].min() // 1000 * 1000
-    max_val = (df['num_imprese_attive'].max() // 1000 + 1) * 1000
+    vals = df['num_imprese_attive'].to_numpy()
+    min_val = vals.min() // 1000 * 1000
+    max_val = (vals.max() // 1000 + 1) * 1000
     ax.set_ylim(min_val, max_val)
     ax.yaxis.set_major_locator(ticker.MultipleLocator(1000))
 
-    # Mostra griglia e allinea X
+    # Mostra griglia e allinea X: un tick per anno, nessun tick minore
     ax.grid(True, linestyle='--', alpha=0.5)
-    ax.set_xticks(df['anno'])
-    ax.set_xticklabels(df['anno'], rotation=45, ha='right')
+    years = np.unique(df['anno'].to_numpy())
+    ax.xaxis.set_major_locator(ticker.FixedLocator(years))
+    ax.xaxis.set_major_formatter(ticker.FormatStrFormatter('%d'))
+    ax.xaxis.set_minor_locator(ticker.NullLocator())
+    ax.yaxis.set_minor_locator(ticker.NullLocator())
+    ax.tick_params(axis='x', labelrotation=45)
+    plt.setp(ax.get_xticklabels(), ha='right')
 
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    if output_png:
+        fig.savefig(output_png, dpi=100)
+    else:
+        plt.show()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Genera grafico da CSV")
     parser.add_argument('-f', '--file', required=True, help="Path del CSV di input")
+    parser.add_argument('-o', '--output', help="Path del PNG di output (default: mostra a video)")
     args = parser.parse_args()
-    plot_data(args.file)
+    plot_data(args.file, args.output)
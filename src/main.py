@@ -29,6 +29,9 @@ Esempi d'uso:
   
   # Con formato data completo
   %(prog)s --provincia Venezia --start 2023-09-30 --end 2024-09-30
+  
+  # Più province della stessa regione in una sola estrazione
+  %(prog)s --provincia Venezia,Padova,Treviso --start 2020-03 --end 2024-09
         """
     )
     
@@ -36,7 +39,7 @@ Esempi d'uso:
     parser.add_argument(
         "--provincia",
         type=str,
-        help="Provincia da estrarre (es: Venezia, Padova)"
+        help="Provincia da estrarre, o più province separate da virgola (es: Venezia,Padova)"
     )
     
     parser.add_argument(
@@ -148,14 +151,27 @@ def main() -> int:
             logger.error("Devi specificare --start e --end")
             return 1
         
-        # Estrazione dati
-        logger.info(f"Avvio estrazione per {args.provincia}...")
+        province = [p.strip() for p in args.provincia.split(",") if p.strip()]
+        
+        # Determina percorso output
+        if args.output:
+            output_path = Path(args.output)
+        else:
+            output_dir = Path(config["output"]["csv_directory"])
+            nome = "-".join(p.lower() for p in province)
+            filename = f"{nome}_{args.start}_{args.end}.csv"
+            output_path = output_dir / filename
+        
+        # Estrazione dati (le righe vengono salvate man mano nel CSV)
+        logger.info(f"Avvio estrazione per {', '.join(province)}...")
+        logger.info(f"Salvataggio dati in: {output_path}")
         
-        data = scraper.scrape_data(
-            provincia=args.provincia,
+        data = scraper.scrape_data_many(
+            province=province,
             periodo_start=args.start,
             periodo_end=args.end,
-            regione=args.regione
+            regione=args.regione,
+            output_path=output_path
         )
         
         if data is None or len(data) == 0:
@@ -164,18 +180,6 @@ def main() -> int:
         
         logger.info(f"Estratte {len(data)} righe di dati")
         
-        # Determina percorso output
-        if args.output:
-            output_path = Path(args.output)
-        else:
-            output_dir = Path(config["output"]["csv_directory"])
-            filename = f"{args.provincia.lower()}_{args.start}_{args.end}.csv"
-            output_path = output_dir / filename
-        
-        # Salva dati
-        logger.info(f"Salvataggio dati in: {output_path}")
-        scraper.save_to_csv(data, output_path)
-        
         # Mostra statistiche
         if args.stats:
             print("\n📊 Statistiche dei dati estratti:\n")
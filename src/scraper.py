@@ -3,29 +3,118 @@ Camera di Commercio Marche - Scraper Core
 Scraping diretto dalla tabella pivot HTML
 """
 
+import csv
 import logging
-import time
+import os
 from pathlib import Path
 from typing import Dict, List, Optional, Any
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from lxml import html as lxml_html
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
+
+from utils import load_json, get_province_name_normalized
 
 
 logger = logging.getLogger(__name__)
 
+# Separatori da rimuovere dai valori numerici della tabella pivot
+_NUM_CLEAN = str.maketrans({'.': None, ',': None, ' ': None, '\u00a0': None})
+
+# Mapping regione -> {provincia: sigla}
+PROVINCES_FILE = Path(__file__).resolve().parent.parent / "config" / "provinces.json"
+_PROVINCES: Dict[str, Dict[str, str]] = load_json(PROVINCES_FILE)
+
+# Regioni in ordine stabile, con un set in maiuscolo per i test di appartenenza
+# case-insensitive in O(1) (le API usano "VENETO", provinces.json "Veneto")
+_REGIONS = tuple(_PROVINCES)
+_REGION_SET = frozenset(r.upper() for r in _REGIONS)
+
+# Sigle per nome provincia normalizzato, calcolate una sola volta all'import
+_PROVINCE_CODES: Dict[str, str] = {
+    get_province_name_normalized(name): code
+    for provinces in _PROVINCES.values()
+    for name, code in provinces.items()
+}
+
+
+def _yoy_growth(gruppi: np.ndarray, anni: np.ndarray, vals: np.ndarray) -> np.ndarray:
+    """
+    Calcola le variazioni percentuali tra anni consecutivi di ogni gruppo.
+    
+    Somma prima i valori per (gruppo, anno), così più righe dello stesso anno
+    (es: settori o più periodi) non vengono confrontate tra loro, poi confronta
+    ogni anno con il precedente dello stesso gruppo solo se è l'anno
+    immediatamente successivo. Tutto con operazioni vettoriali numpy.
+    
+    Args:
+        gruppi: Codici interi del gruppo (es: provincia) per riga
+        anni: Anno di riferimento per riga
+        vals: Valori per riga
+        
+    Returns:
+        Array delle variazioni percentuali (senza i confronti con valore precedente nullo)
+    """
+    if len(vals) == 0:
+        return np.empty(0, dtype=np.float64)
+    
+    order = np.lexsort((anni, gruppi))
+    g = gruppi[order]
+    a = anni[order].astype(np.int64)
+    v = vals[order].astype(np.float64)
+    
+    # Totali per (gruppo, anno): inizio di ogni blocco con la stessa chiave
+    starts = np.flatnonzero(np.r_[True, (g[1:] != g[:-1]) | (a[1:] != a[:-1])])
+    totali = np.add.reduceat(v, starts)
+    g = g[starts]
+    a = a[starts]
+    
+    prev = totali[:-1]
+    valid = (g[1:] == g[:-1]) & (a[1:] - a[:-1] == 1) & (prev != 0)
+    
+    return (totali[1:][valid] - prev[valid]) / prev[valid] * 100
+
 
 class CamcomScraper:
     """Scraper per la tabella pivot della Camera di Commercio Marche."""
     
     BASE_URL = "https://opendata.marche.camcom.it/pivot-table.htm"
     
+    # Colonne del CSV di output, nell'ordine in cui vengono scritte
+    CSV_COLUMNS = ['provincia', 'periodo', 'num_imprese_attive', 'data_estrazione']
+    
+    # Tipi compatti per il DataFrame restituito (province ripetute su ogni riga)
+    DATA_DTYPES = {'provincia': 'category', 'num_imprese_attive': 'int32'}
+    
+    # Valori delle opzioni del select dei periodi, letti in un solo round-trip
+    _READ_PERIODS_JS = (
+        "return Array.from("
+        "document.querySelectorAll('#pivot-time option'), o => o.value);"
+    )
+    
+    # HTML della tabella pivot, analizzato poi in locale con lxml
+    _READ_TABLE_JS = (
+        "const t = document.querySelector('.pvtTable');"
+        "return t ? t.outerHTML : null;"
+    )
+    
+    # Selezione del periodo senza ricercare il select e l'opzione via WebDriver.
+    # Restituisce false se il periodo era già selezionato (nessun refresh).
+    _SELECT_PERIOD_JS = (
+        "const s = document.getElementById('pivot-time');"
+        "if (s.value === arguments[0]) return false;"
+        "s.value = arguments[0];"
+        "s.dispatchEvent(new Event('change', {bubbles: true}));"
+        "return true;"
+    )
+    
     def __init__(self, config: Dict[str, Any], headless: bool = True):
         """
         Inizializza lo scraper.
@@ -38,6 +127,9 @@ class CamcomScraper:
         self.headless = headless
         self.driver = None
         
+        # Periodi disponibili per regione, già ordinati dal più recente
+        self._periods_cache: Dict[str, List[str]] = {}
+        
         logger.info("Scraper inizializzato")
     
     def _init_driver(self):
@@ -55,17 +147,155 @@ class CamcomScraper:
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--window-size=1920,1080')
         
+        # Servono solo #pivot-time e .pvtTable: niente immagini, CSS e font
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+            "profile.managed_default_content_settings.fonts": 2
+        })
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        
+        # Riduci il traffico in background di Chrome
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_argument('--disable-sync')
+        chrome_options.add_argument('--metrics-recording-only')
+        
+        # get() ritorna a DOM pronto: il resto è coperto dalle attese esplicite
+        chrome_options.page_load_strategy = 'eager'
+        
         self.driver = webdriver.Chrome(options=chrome_options)
-        self.driver.implicitly_wait(10)
         
         logger.info("Driver Chrome pronto")
     
     def _close_driver(self):
-        """Chiude il driver Selenium."""
-        if self.driver:
-            self.driver.quit()
-            self.driver = None
+        """Chiude il driver Selenium (idempotente, sicuro anche in shutdown)."""
+        driver = getattr(self, 'driver', None)
+        if driver is None:
+            return
+        
+        # Azzera prima di quit(): una chiamata rientrante non chiude due volte
+        self.driver = None
+        try:
+            driver.quit()
             logger.info("Driver Chrome chiuso")
+        except Exception:
+            pass
+    
+    def list_regions(self) -> List[str]:
+        """
+        Elenca le regioni disponibili.
+        
+        Returns:
+            Lista dei nomi delle regioni (es: ['Abruzzo', ..., 'Veneto'])
+        """
+        return list(_REGIONS)
+    
+    def list_provinces(self) -> Dict[str, List[str]]:
+        """
+        Elenca le province per regione.
+        
+        Returns:
+            Dizionario regione -> lista dei nomi delle province
+        """
+        return {regione: list(province) for regione, province in _PROVINCES.items()}
+    
+    @staticmethod
+    def is_valid_region(regione: str) -> bool:
+        """
+        Verifica se una regione è tra quelle note.
+        
+        Args:
+            regione: Nome della regione (case-insensitive, es: "VENETO")
+            
+        Returns:
+            True se la regione esiste
+        """
+        return regione.strip().upper() in _REGION_SET
+    
+    @staticmethod
+    def _get_province_code(provincia: str) -> Optional[str]:
+        """
+        Restituisce la sigla di una provincia (es: "venezia" -> "VE").
+        
+        Args:
+            provincia: Nome provincia (case-insensitive)
+            
+        Returns:
+            Sigla della provincia oppure None se sconosciuta
+        """
+        return _PROVINCE_CODES.get(get_province_name_normalized(provincia))
+    
+    def _pivot_url(self, regione: str) -> str:
+        """Costruisce l'URL della tabella pivot filtrata per regione."""
+        return f"{self.BASE_URL}?indic=Art&r1=2&r2=3&r3=4&c1=1&f1=0&f1v={regione.upper()}"
+    
+    def _load_pivot_page(self, regione: str):
+        """
+        Naviga sulla tabella pivot e attende il caricamento del select dei periodi.
+        
+        Args:
+            regione: Regione da filtrare
+        """
+        url = self._pivot_url(regione)
+        
+        logger.info(f"Caricamento pagina: {url}")
+        self.driver.get(url)
+        
+        # Attendi caricamento select dei periodi e rendering della tabella
+        wait = WebDriverWait(self.driver, 20)
+        wait.until(EC.presence_of_element_located((By.ID, "pivot-time")))
+        wait.until(EC.presence_of_element_located((By.CLASS_NAME, "pvtTable")))
+    
+    def _select_period(self, periodo: str):
+        """
+        Seleziona un periodo e attende che la tabella pivot venga ridisegnata.
+        
+        La tabella viene sostituita a ogni cambio di periodo: si attende che
+        il vecchio nodo diventi stale e che il nuovo sia presente, invece di
+        un'attesa fissa.
+        
+        Args:
+            periodo: Valore dell'opzione da selezionare
+        """
+        old_tables = self.driver.find_elements(By.CLASS_NAME, "pvtTable")
+        
+        if not self.driver.execute_script(self._SELECT_PERIOD_JS, periodo):
+            return  # Periodo già selezionato: la tabella è aggiornata
+        
+        wait = WebDriverWait(self.driver, 20)
+        if old_tables:
+            wait.until(EC.staleness_of(old_tables[0]))
+        wait.until(EC.presence_of_element_located((By.CLASS_NAME, "pvtTable")))
+    
+    def _parse_periods(self) -> List[str]:
+        """
+        Legge i periodi dal select 'pivot-time' della pagina già caricata.
+        
+        Le opzioni vengono lette con un solo comando JS invece di una
+        chiamata WebDriver per ogni opzione.
+        
+        Returns:
+            Lista di periodi ordinata dal più recente al più vecchio
+        """
+        values = self.driver.execute_script(self._READ_PERIODS_JS)
+        periods = [value for value in values if value]
+        
+        logger.info(f"Trovati {len(periods)} periodi nel select")
+        return sorted(periods, reverse=True)  # Dal più recente al più vecchio
+    
+    def _fetch_periods(self, regione: str) -> List[str]:
+        """
+        Carica la pagina della regione e ne legge i periodi disponibili.
+        
+        Args:
+            regione: Regione da filtrare
+            
+        Returns:
+            Lista di periodi ordinata dal più recente al più vecchio
+        """
+        self._load_pivot_page(regione)
+        return self._parse_periods()
     
     def get_available_periods(self, regione: str = "VENETO") -> List[str]:
         """
@@ -77,209 +307,283 @@ class CamcomScraper:
         Returns:
             Lista di periodi disponibili (es: ['2025-09-30', '2025-03', ...])
         """
+        if not self.is_valid_region(regione):
+            logger.error(f"Regione sconosciuta: {regione}")
+            return []
+        
+        key = regione.upper()
+        # Restituisce copie: chi ordina o filtra la lista non altera la cache
+        if key in self._periods_cache:
+            return list(self._periods_cache[key])
+        
         self._init_driver()
         
         try:
-            # Costruisci URL
-            url = f"{self.BASE_URL}?indic=Art&r1=2&r2=3&r3=4&c1=1&f1=0&f1v={regione.upper()}"
+            periods = self._fetch_periods(regione)
+            if periods:
+                self._periods_cache[key] = periods
+            return list(periods)
             
-            logger.info(f"Caricamento pagina: {url}")
-            self.driver.get(url)
+        except Exception as e:
+            logger.error(f"Errore nel recupero periodi: {e}")
+            return []
+
+    @staticmethod
+    def _parse_pivot_values(table_html: str, province: List[str]) -> Dict[str, Optional[int]]:
+        """
+        Estrae i valori per più province dall'HTML della tabella pivot.
+        
+        Per ogni provincia cerca la colonna con header contenente il nome (match case-insensitive),
+        poi prende la cella corrispondente nell'ultima riga della tabella (tipicamente la riga dei totali).
+        La tabella viene analizzata una sola volta per tutte le province.
+        
+        Args:
+            table_html: outerHTML della tabella con classe pvtTable
+            province: Nomi delle province da cercare
             
-            # Attendi caricamento select dei periodi
-            wait = WebDriverWait(self.driver, 20)
-            wait.until(EC.presence_of_element_located((By.ID, "pivot-time")))
+        Returns:
+            Dizionario provincia -> valore numerico (None se non trovato)
+        """
+        values: Dict[str, Optional[int]] = dict.fromkeys(province)
+        
+        table = lxml_html.fromstring(table_html)
+        
+        # Header: tutte le colonne che rappresentano province
+        labels = [label.text_content().upper() for label in table.cssselect(".pvtColLabel")]
+        
+        # Tutte le righe della tabella
+        rows = table.cssselect("tr")
+        if not rows:
+            logger.warning("Nessuna riga trovata nella tabella pivot.")
+            return values
+        
+        # Ultima riga (di solito la riga dei totali)
+        cells = rows[-1].cssselect("td")
+        
+        for provincia in province:
+            provincia_upper = provincia.upper()
+            col_index = next(
+                (idx for idx, label in enumerate(labels) if provincia_upper in label),
+                None
+            )
             
-            time.sleep(1)  # Attendi rendering completo
+            if col_index is None:
+                logger.warning(f"Provincia '{provincia}' non trovata nelle colonne della tabella pivot.")
+                continue
             
-            # Trova il select con id "pivot-time"
-            select_element = self.driver.find_element(By.ID, "pivot-time")
+            if col_index >= len(cells):
+                logger.warning(f"Colonna {col_index} non presente nell'ultima riga.")
+                continue
             
-            # Estrai tutte le opzioni
-            options = select_element.find_elements(By.TAG_NAME, "option")
+            # Valore testuale della cella
+            value_text = cells[col_index].text_content().strip()
             
-            periods = []
-            for option in options:
-                value = option.get_attribute("value")
-                if value:
-                    periods.append(value)
+            # Normalize: rimuovi separatori
+            try:
+                values[provincia] = int(value_text.translate(_NUM_CLEAN))
+            except ValueError:
+                logger.warning(f"Valore non numerico per provincia '{provincia}': '{value_text}'")
+        
+        return values
+    
+    def _extract_values_for_provinces(self, province: List[str]) -> Dict[str, Optional[int]]:
+        """
+        Estrae i valori dalla tabella pivot per una o più province.
+        
+        L'HTML della tabella viene letto con un solo comando WebDriver e
+        analizzato in locale con lxml, invece di interrogare il browser
+        per ogni intestazione, riga e cella.
+        
+        Args:
+            province: Nomi delle province da cercare.
             
-            logger.info(f"Trovati {len(periods)} periodi nel select")
-            return sorted(periods, reverse=True)  # Dal più recente al più vecchio
+        Returns:
+            Dizionario provincia -> valore numerico (None se non trovato).
+        """
+        try:
+            WebDriverWait(self.driver, 5).until(
+                EC.presence_of_element_located((By.CLASS_NAME, "pvtTable"))
+            )
+            table_html = self.driver.execute_script(self._READ_TABLE_JS)
+            
+            if not table_html:
+                logger.error("Elemento tabella pivot non trovato.")
+                return dict.fromkeys(province)
             
+            return self._parse_pivot_values(table_html, province)
+            
+        except TimeoutException:
+            logger.error("Elemento tabella pivot non trovato.")
+            return dict.fromkeys(province)
         except Exception as e:
-            logger.error(f"Errore nel recupero periodi: {e}")
-            return []
-
-    def _extract_value_for_province(self, provincia: str) -> Optional[int]:
-      """
-      Estrae il valore dalla tabella pivot per una provincia specifica.
-      
-      Cerca la colonna con header contenente il nome della provincia (match case-insensitive).
-      Poi prende la cella corrispondente nell'ultima riga della tabella (tipicamente la riga dei totali).
-
-      Args:
-          provincia: Nome della provincia da cercare.
-
-      Returns:
-          Valore numerico oppure None se non trovato.
-      """
-      try:
-          # Trova la tabella pivot
-          table = self.driver.find_element(By.CLASS_NAME, "pvtTable")
-
-          # Header: tutte le colonne che rappresentano province
-          col_labels = table.find_elements(By.CLASS_NAME, "pvtColLabel")
-
-          provincia_upper = provincia.upper()
-          col_index = None
-
-          # Identifica indice della colonna
-          for idx, col_label in enumerate(col_labels):
-              if provincia_upper in col_label.text.upper():
-                  col_index = idx
-                  break
-
-          if col_index is None:
-              logger.warning(f"Provincia '{provincia}' non trovata nelle colonne della tabella pivot.")
-              return None
-
-          # Tutte le righe della tabella
-          rows = table.find_elements(By.TAG_NAME, "tr")
-          if not rows:
-              logger.warning("Nessuna riga trovata nella tabella pivot.")
-              return None
-
-          # Ultima riga (di solito la riga dei totali)
-          last_row = rows[-1]
-          cells = last_row.find_elements(By.TAG_NAME, "td")
-
-          if col_index >= len(cells):
-              logger.warning(f"Colonna {col_index} non presente nell'ultima riga.")
-              return None
-
-          # Valore testuale della cella
-          value_text = cells[col_index].text.strip()
-
-          # Normalize: rimuovi separatori
-          cleaned = value_text.replace('.', '').replace(',', '').replace(' ', '')
-
-          if cleaned.isdigit():
-              return int(cleaned)
-
-          logger.warning(f"Valore non numerico per provincia '{provincia}': '{value_text}'")
-          return None
-
-      except NoSuchElementException:
-          logger.error("Elemento tabella pivot non trovato.")
-          return None
-      except Exception as e:
-          logger.error(f"Errore nell'estrazione del valore: {e}")
-          return None
-    
+            logger.error(f"Errore nell'estrazione del valore: {e}")
+            return dict.fromkeys(province)
     
     def scrape_data(
         self,
         provincia: str,
         periodo_start: str,
         periodo_end: str,
-        regione: str = "VENETO"
+        regione: str = "VENETO",
+        output_path: Optional[Path] = None
     ) -> Optional[pd.DataFrame]:
         """
-        Scrape i dati dalla tabella pivot.
-        Usa i periodi esatti disponibili nel select #pivot-time.
+        Scrape i dati di una provincia dalla tabella pivot.
         
         Args:
             provincia: Nome provincia (es: "Venezia")
             periodo_start: Periodo iniziale (es: "2020-03")
             periodo_end: Periodo finale (es: "2024-09")
             regione: Regione di appartenenza
+            output_path: Percorso del CSV da scrivere durante l'estrazione (opzionale)
             
         Returns:
             DataFrame con i dati estratti
         """
+        return self.scrape_data_many(
+            [provincia],
+            periodo_start=periodo_start,
+            periodo_end=periodo_end,
+            regione=regione,
+            output_path=output_path
+        )
+    
+    def scrape_data_many(
+        self,
+        province: List[str],
+        periodo_start: str,
+        periodo_end: str,
+        regione: str = "VENETO",
+        output_path: Optional[Path] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Scrape i dati di più province dalla tabella pivot.
+        Usa i periodi esatti disponibili nel select #pivot-time.
+        
+        La tabella contiene una colonna per ogni provincia della regione:
+        per ogni periodo viene letta una sola volta e ne vengono estratte
+        tutte le province richieste.
+        
+        Se output_path è indicato, ogni riga viene scritta su CSV appena
+        estratta (in un file '.part' rinominato a fine estrazione), così
+        un'interruzione non fa perdere i periodi già elaborati.
+        
+        Args:
+            province: Nomi delle province (es: ["Venezia", "Padova"])
+            periodo_start: Periodo iniziale (es: "2020-03")
+            periodo_end: Periodo finale (es: "2024-09")
+            regione: Regione di appartenenza
+            output_path: Percorso del CSV da scrivere durante l'estrazione (opzionale)
+            
+        Returns:
+            DataFrame con i dati estratti
+        """
+        if not self.is_valid_region(regione):
+            logger.error(f"Regione sconosciuta: {regione}")
+            return None
+        
         self._init_driver()
         
+        csv_file = None
+        
         try:
-            # Costruisci URL base
-            url = f"{self.BASE_URL}?indic=Art&r1=2&r2=3&r3=4&c1=1&f1=0&f1v={regione.upper()}"
-            
-            logger.info(f"Caricamento pagina iniziale: {url}")
-            self.driver.get(url)
+            # Una sola navigazione: i periodi si leggono dalla pagina già caricata
+            self._load_pivot_page(regione)
             
-            # Attendi caricamento
-            wait = WebDriverWait(self.driver, 20)
-            wait.until(EC.presence_of_element_located((By.ID, "pivot-time")))
-            time.sleep(1)
-            
-            # Ottieni tutti i periodi disponibili
-            all_periods = self.get_available_periods(regione)
+            key = regione.upper()
+            all_periods = self._periods_cache.get(key)
+            if all_periods is None:
+                all_periods = self._parse_periods()
+                if all_periods:
+                    self._periods_cache[key] = all_periods
             
             if not all_periods:
                 logger.error("Nessun periodo disponibile")
                 return None
             
-            # Filtra i periodi tra start e end
-            periodi = [p for p in all_periods if periodo_start <= p <= periodo_end]
+            # Filtra i periodi tra start e end mantenendone uno per anno: il primo
+            # incontrato è il più recente perché all_periods è in ordine decrescente
+            anni_visti = set()
+            periodi_finali = []
+            for p in all_periods:
+                anno = p[:4]
+                if periodo_start <= p <= periodo_end and anno not in anni_visti:
+                    anni_visti.add(anno)
+                    periodi_finali.append(p)
 
-            if not periodi:
+            if not periodi_finali:
                 logger.warning(f"Nessun periodo trovato tra {periodo_start} e {periodo_end}")
                 logger.info(f"Periodi disponibili: {all_periods[:5]}... (primi 5)")
                 return None
 
-            # Mantieni un solo periodo per anno (il primo perché all_periods è già in ordine decrescente)
-            periodi_unici = {}
-            for p in periodi:
-                anno = p[:4]
-                if anno not in periodi_unici:
-                    periodi_unici[anno] = p
-
-            # Lista finale, ordinata per anno decrescente
-            periodi_finali = sorted(periodi_unici.values(), reverse=True)
-
             logger.info(f"Periodi selezionati (uno per anno): {periodi_finali}")
 
+            writer = None
+            if output_path is not None:
+                output_path = Path(output_path)
+                part_path = output_path.with_name(output_path.name + '.part')
+                part_path.parent.mkdir(parents=True, exist_ok=True)
+                
+                csv_file = open(part_path, 'w', newline='', encoding='utf-8')
+                writer = csv.DictWriter(csv_file, fieldnames=self.CSV_COLUMNS)
+                writer.writeheader()
             
             all_data = []
             
+            # Stesso timestamp di estrazione per tutte le righe della run
+            data_estrazione = datetime.now().isoformat()
+            
             for i, periodo in enumerate(periodi_finali, 1):
                 logger.info(f"[{i}/{len(periodi_finali)}] Elaborazione periodo: {periodo}")
                 
                 try:
-                    # Seleziona il periodo nel dropdown
-                    select_element = self.driver.find_element(By.ID, "pivot-time")
-                    
-                    # Trova l'opzione con il valore del periodo
-                    option = select_element.find_element(By.CSS_SELECTOR, f"option[value='{periodo}']")
-                    option.click()
+                    # Seleziona il periodo e attendi il refresh della tabella
+                    self._select_period(periodo)
                     
-                    # Attendi che la tabella si aggiorni
-                    time.sleep(2)  # Importante: attendi il refresh della tabella
-                    
-                    # Estrai il valore per la provincia
-                    valore = self._extract_value_for_province(provincia)
-                    
-                    if valore is not None:
-                        all_data.append({
-                            'provincia': provincia,
-                            'periodo': periodo,
-                            'num_imprese_attive': valore,
-                            'data_estrazione': datetime.now().isoformat()
-                        })
-                        logger.info(f"  ✓ {provincia} - {periodo}: {valore:,} imprese")
-                    else:
-                        logger.warning(f"  ✗ Valore non trovato per {provincia} - {periodo}")
+                    # Estrai i valori di tutte le province dalla stessa tabella
+                    valori = self._extract_values_for_provinces(province)
                     
                 except Exception as e:
                     logger.error(f"Errore nell'elaborazione periodo {periodo}: {e}")
                     continue
+                
+                # Fuori dal try: un errore di scrittura (es. disco pieno) interrompe
+                # l'estrazione e lascia il file '.part' invece di promuoverlo incompleto
+                for provincia, valore in valori.items():
+                    if valore is None:
+                        logger.warning(f"  ✗ Valore non trovato per {provincia} - {periodo}")
+                        continue
+                    
+                    row = {
+                        'provincia': provincia,
+                        'periodo': periodo,
+                        'num_imprese_attive': valore,
+                        'data_estrazione': data_estrazione
+                    }
+                    all_data.append(row)
+                    
+                    if writer is not None:
+                        writer.writerow(row)
+                    
+                    logger.info(f"  ✓ {provincia} - {periodo}: {valore:,} imprese")
+                
+                if csv_file is not None:
+                    csv_file.flush()
+            
+            if csv_file is not None:
+                csv_file.close()
+                if all_data:
+                    os.replace(part_path, output_path)
+                    logger.info(f"CSV salvato: {output_path}")
+                else:
+                    part_path.unlink()
             
             if not all_data:
                 logger.warning("Nessun dato estratto")
                 return None
             
             # Crea DataFrame
-            df = pd.DataFrame(all_data)
+            df = pd.DataFrame(all_data, columns=self.CSV_COLUMNS).astype(self.DATA_DTYPES)
             logger.info(f"Estrazione completata: {len(df)} record")
             
             return df
@@ -289,80 +593,10 @@ class CamcomScraper:
             return None
         
         finally:
+            if csv_file is not None:
+                csv_file.close()
             self._close_driver()
     
-    def __del__(self):
-        """Cleanup quando l'oggetto viene distrutto."""
-        self._close_driver()
-        """
-        Estrae il valore dalla tabella pvtTable per una provincia specifica.
-        Trova la colonna con classe pvtColLabel che contiene il nome della provincia (uppercase),
-        poi prende il valore dall'ultima riga di quella colonna.
-        
-        Args:
-            provincia: Nome provincia (es: "Venezia")
-            periodo: Periodo da cercare
-            
-        Returns:
-            Valore numerico del totale o None
-        """
-        try:
-            # Trova la tabella con classe pvtTable
-            table = self.driver.find_element(By.CLASS_NAME, "pvtTable")
-            
-            # Trova tutte le colonne con classe pvtColLabel
-            col_labels = table.find_elements(By.CLASS_NAME, "pvtColLabel")
-            
-            provincia_upper = provincia.upper()
-            col_index = None
-            
-            # Cerca l'indice della colonna che contiene il nome della provincia
-            for idx, col_label in enumerate(col_labels):
-                if provincia_upper in col_label.text.upper():
-                    col_index = idx
-                    logger.debug(f"Trovata provincia '{provincia}' nella colonna {idx}")
-                    break
-            
-            if col_index is None:
-                logger.warning(f"Provincia '{provincia}' non trovata nelle colonne")
-                return None
-            
-            # Trova tutte le righe della tabella
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            
-            if not rows:
-                logger.warning("Nessuna riga trovata nella tabella")
-                return None
-            
-            # Prendi l'ultima riga (che contiene i totali)
-            last_row = rows[-1]
-            cells = last_row.find_elements(By.TAG_NAME, "td")
-            
-            if not cells or col_index >= len(cells):
-                logger.warning(f"Colonna {col_index} non trovata nell'ultima riga")
-                return None
-            
-            # Estrai il valore dalla cella corrispondente
-            value_text = cells[col_index].text.strip()
-            
-            # Pulisci il valore: rimuovi separatori di migliaia
-            value_clean = value_text.replace('.', '').replace(',', '').replace(' ', '')
-            
-            if value_clean.isdigit():
-                value = int(value_clean)
-                logger.debug(f"Valore estratto: {value}")
-                return value
-            else:
-                logger.warning(f"Valore non numerico: '{value_text}'")
-                return None
-            
-        except NoSuchElementException as e:
-            logger.error(f"Elemento non trovato: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Errore nell'estrazione valore: {e}")
-            return None
-    
     def save_to_csv(self, data: pd.DataFrame, output_path: Path):
         """
         Salva i dati in formato CSV.
@@ -399,21 +633,66 @@ class CamcomScraper:
         }
         
         if 'periodo' in data.columns:
-            periods = data['periodo'].unique()
+            # min/max lessicografici: i periodi sono date ISO
+            periods = data['periodo'].to_numpy()
             if len(periods) > 0:
-                stats['periodi_coperti'] = f"{min(periods)} - {max(periods)}"
+                stats['periodi_coperti'] = f"{periods.min()} - {periods.max()}"
         
         if 'provincia' in data.columns:
             stats['province_presenti'] = data['provincia'].nunique()
         
         if 'num_imprese_attive' in data.columns:
-            stats['totale_imprese'] = int(data['num_imprese_attive'].sum())
-            stats['media_imprese'] = int(data['num_imprese_attive'].mean())
-            stats['min_imprese'] = int(data['num_imprese_attive'].min())
-            stats['max_imprese'] = int(data['num_imprese_attive'].max())
+            # Tutte le riduzioni sullo stesso buffer numpy
+            vals = data['num_imprese_attive'].to_numpy()
+            if len(vals) > 0:
+                totale = int(vals.sum())
+                stats['totale_imprese'] = totale
+                stats['media_imprese'] = int(totale / len(vals))
+                stats['min_imprese'] = int(vals.min())
+                stats['max_imprese'] = int(vals.max())
+        
+        calcola_crescita = self.config.get('processing', {}).get('calculate_growth_rates', True)
+        if calcola_crescita and 'num_imprese_attive' in data.columns:
+            stats['crescita_media_annua'] = self._growth_rate(data)
         
         return stats
     
+    @staticmethod
+    def _growth_rate(data: pd.DataFrame) -> Optional[float]:
+        """
+        Calcola la variazione percentuale media anno su anno, per provincia.
+        
+        Args:
+            data: DataFrame con num_imprese_attive e una colonna 'anno' o 'periodo'
+            
+        Returns:
+            Variazione media in percentuale (2 decimali) oppure None se non calcolabile
+        """
+        if 'anno' in data.columns:
+            anni = pd.to_numeric(data['anno'], errors='coerce')
+        elif 'periodo' in data.columns:
+            anni = pd.to_numeric(data['periodo'].astype(str).str[:4], errors='coerce')
+        else:
+            return None
+        
+        # Scarta le righe senza un anno valido (es. periodo non ISO)
+        validi = anni.notna().to_numpy()
+        if not validi.any():
+            return None
+        data = data[validi]
+        anni = anni[validi].to_numpy(dtype=np.int16)
+        
+        if 'provincia' in data.columns:
+            gruppi = data['provincia'].astype('category').cat.codes.to_numpy()
+        else:
+            gruppi = np.zeros(len(data), dtype=np.int8)
+        
+        crescita = _yoy_growth(gruppi, anni, data['num_imprese_attive'].to_numpy())
+        if len(crescita) == 0:
+            return None
+        
+        return round(float(crescita.mean()), 2)
+    
     def __del__(self):
         """Cleanup quando l'oggetto viene distrutto."""
         self._close_driver()
\ No newline at end of file
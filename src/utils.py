@@ -2,13 +2,27 @@
 Utility functions per il progetto
 """
 
+import copy
 import json
 import logging
+import sys
+import time
 import yaml
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any
 from datetime import datetime
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML senza libyaml
+    from yaml import SafeLoader as _YamlLoader
+
+try:
+    import orjson
+except ImportError:  # Dipendenza opzionale: si usa json della stdlib
+    orjson = None
+
 
 def setup_logging(level: int = logging.INFO, log_file: str = None) -> logging.Logger:
     """
@@ -51,10 +65,29 @@ def setup_logging(level: int = logging.INFO, log_file: str = None) -> logging.Lo
     return logger
 
 
+@lru_cache(maxsize=8)
+def _cached_load_yaml(abs_path: str, mtime: float) -> Dict[str, Any]:
+    """
+    Legge e fa il parse di un file YAML, con cache per (percorso, mtime).
+    
+    Args:
+        abs_path: Percorso assoluto del file
+        mtime: Data di modifica del file (invalida la cache se cambia)
+        
+    Returns:
+        Contenuto del file YAML
+    """
+    with open(abs_path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
 def load_config(config_path: str) -> Dict[str, Any]:
     """
     Carica la configurazione da file YAML.
     
+    Il parse viene fatto una sola volta finché il file non viene modificato;
+    ogni chiamata restituisce una copia indipendente.
+    
     Args:
         config_path: Percorso del file di configurazione
         
@@ -66,8 +99,10 @@ def load_config(config_path: str) -> Dict[str, Any]:
     if not config_file.exists():
         raise FileNotFoundError(f"File di configurazione non trovato: {config_path}")
     
-    with open(config_file, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+    config_file = config_file.resolve()
+    config = copy.deepcopy(
+        _cached_load_yaml(str(config_file), config_file.stat().st_mtime)
+    )
     
     # Validazione configurazione base
     required_keys = ['api', 'output', 'extraction']
@@ -88,6 +123,9 @@ def load_json(file_path: Path) -> Dict[str, Any]:
     Returns:
         Dati JSON come dizionario
     """
+    if orjson is not None:
+        return orjson.loads(file_path.read_bytes())
+    
     with open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
@@ -102,6 +140,12 @@ def save_json(data: Any, file_path: Path):
     """
     file_path.parent.mkdir(parents=True, exist_ok=True)
     
+    if orjson is not None:
+        file_path.write_bytes(
+            orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        )
+        return
+    
     with open(file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
@@ -171,6 +215,9 @@ def format_number(num: int) -> str:
     return f"{num:,}".replace(',', '.')
 
 
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+
 def calculate_file_size(file_path: Path) -> str:
     """
     Calcola la dimensione di un file in formato leggibile.
@@ -186,12 +233,16 @@ def calculate_file_size(file_path: Path) -> str:
     
     size_bytes = file_path.stat().st_size
     
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size_bytes < 1024.0:
-            return f"{size_bytes:.1f} {unit}"
-        size_bytes /= 1024.0
+    # Indice dell'unità = floor(log2(size) / 10), dalla lunghezza in bit
+    unit_index = min(len(_SIZE_UNITS) - 1, max(0, (size_bytes.bit_length() - 1) // 10))
     
-    return f"{size_bytes:.1f} TB"
+    return f"{size_bytes / (1 << (10 * unit_index)):.1f} {_SIZE_UNITS[unit_index]}"
+
+
+# Accenti e spazi sostituiti in un solo passaggio da get_province_name_normalized
+_PROVINCE_FOLD = str.maketrans({
+    'à': 'a', 'è': 'e', 'é': 'e', 'ì': 'i', 'ò': 'o', 'ù': 'u', ' ': '-'
+})
 
 
 def get_province_name_normalized(province: str) -> str:
@@ -202,14 +253,17 @@ def get_province_name_normalized(province: str) -> str:
         province: Nome provincia
         
     Returns:
-        Nome normalizzato (lowercase, senza spazi)
+        Nome normalizzato (lowercase, senza accenti, senza spazi)
     """
-    return province.lower().strip().replace(' ', '-')
+    return sys.intern(province.strip().lower().translate(_PROVINCE_FOLD))
 
 
 class ProgressBar:
     """Barra di progresso semplice per operazioni lunghe."""
     
+    # Intervallo minimo tra due ridisegni (secondi)
+    MIN_INTERVAL = 0.1
+    
     def __init__(self, total: int, prefix: str = 'Progress'):
         """
         Inizializza la barra di progresso.
@@ -221,19 +275,29 @@ class ProgressBar:
         self.total = total
         self.prefix = prefix
         self.current = 0
-        self.start_time = datetime.now()
+        self.start_time = time.monotonic()
+        self._last_draw = float('-inf')
     
     def update(self, step: int = 1):
         """
         Aggiorna la barra di progresso.
         
+        Il ridisegno è limitato a uno ogni MIN_INTERVAL secondi, tranne
+        l'ultimo che viene sempre mostrato.
+        
         Args:
             step: Incremento (default: 1)
         """
         self.current += step
-        percentage = (self.current / self.total) * 100
         
-        elapsed = (datetime.now() - self.start_time).total_seconds()
+        now = time.monotonic()
+        done = self.current >= self.total
+        if not done and now - self._last_draw < self.MIN_INTERVAL:
+            return
+        self._last_draw = now
+        
+        percentage = (self.current / self.total) * 100
+        elapsed = now - self.start_time
         
         if self.current > 0:
             eta = elapsed * (self.total - self.current) / self.current
@@ -247,10 +311,10 @@ class ProgressBar:
         
         print(f'\r{self.prefix}: |{bar}| {percentage:.1f}% ({self.current}/{self.total}) {eta_str}', end='')
         
-        if self.current >= self.total:
+        if done:
             print()  # Newline alla fine
     
     def finish(self):
         """Completa la barra di progresso."""
         self.current = self.total
-        self.update(0)
\ No newline at end of file
+        self.update(0)
@@ -0,0 +1,34 @@
+"""
+Fixture condivise dalla test suite
+"""
+
+import pytest
+
+from scraper import CamcomScraper
+
+
+@pytest.fixture(scope="session")
+def config():
+    """Fixture per la configurazione di test."""
+    return {
+        "api": {
+            "base_url": "https://opendata.marche.camcom.it",
+            "timeout": 30,
+            "max_retries": 3
+        },
+        "output": {
+            "csv_directory": "tests/data/processed",
+            "raw_directory": "tests/data/raw",
+            "cache_directory": "tests/data/cache"
+        },
+        "extraction": {
+            "default_start_year": 2020,
+            "default_end_year": 2023
+        }
+    }
+
+
+@pytest.fixture(scope="session")
+def scraper(config):
+    """Fixture per lo scraper (condiviso nella sessione: i test non ne modificano lo stato)."""
+    return CamcomScraper(config=config)
@@ -0,0 +1,42 @@
+"""
+Benchmark di regressione per le funzioni più usate (richiedono pytest-benchmark)
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from scraper import CamcomScraper
+
+pytest.importorskip("pytest_benchmark")
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.benchmark(min_rounds=5, disable_gc=True, warmup=True),
+]
+
+NAMES = ["venezia", "Padova", "ROMA", "Forlì-Cesena", "nonexistent"]
+
+
+@pytest.fixture(scope="module")
+def large_stats_df():
+    """DataFrame di 100k righe con i tipi prodotti dallo scraper."""
+    n_rows = 100_000
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'provincia': rng.choice(['Venezia', 'Padova', 'Rovigo'], n_rows),
+        'periodo': rng.choice(['2023-09-30', '2024-09-30', '2025-09-30'], n_rows),
+        'num_imprese_attive': rng.integers(0, 100_000, n_rows)
+    }).astype(CamcomScraper.DATA_DTYPES)
+
+
+def test_bench_stats(benchmark, scraper, large_stats_df):
+    """Benchmark di get_statistics su 100k righe."""
+    stats = benchmark(scraper.get_statistics, large_stats_df)
+    assert stats['totale_record'] == len(large_stats_df)
+
+
+def test_bench_province_lookup(benchmark):
+    """Benchmark della ricerca della sigla provincia."""
+    codes = benchmark(lambda: [CamcomScraper._get_province_code(n) for n in NAMES * 1000])
+    assert codes[:5] == ["VE", "PD", "RM", "FC", None]